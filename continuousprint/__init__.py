@@ -19,7 +19,7 @@ from octoprint.util import RepeatedTimer
 
 
 from .print_queue import PrintQueue, QueueItem
-from .driver import ContinuousPrintDriver, Action as DA, Printer as DP
+from .driver import ContinuousPrintDriver, Action as DA, Printer as DP, State as DS
 
 QUEUE_KEY = "cp_queue"
 CLEARING_SCRIPT_KEY = "cp_bed_clearing_script"
@@ -88,7 +88,7 @@ class ContinuousprintPlugin(
         return d
 
     def _active(self):
-        return self.d.state != self.d._state_inactive if hasattr(self, "d") else False
+        return self.d.state != DS.INACTIVE if hasattr(self, "d") else False
 
     def _rm_temp_files(self):
         # Clean up any file references from prior runs
@@ -205,7 +205,7 @@ class ContinuousprintPlugin(
             # Note that cancelled events are already handled directly with Events.PRINT_CANCELLED
             self.update(DA.FAILURE)
         elif event == Events.PRINT_CANCELLED:
-            print(payload.get("user"))
+            self._logger.debug("Print cancelled by user %s", payload.get("user"))
             if payload.get("user") is not None:
                 self.update(DA.DEACTIVATE)
             else:
@@ -352,23 +352,21 @@ class ContinuousprintPlugin(
     @octoprint.plugin.BlueprintPlugin.route("/clear", methods=["POST"])
     @restricted_access
     def clear(self):
-        i = 0
         keep_failures = flask.request.form["keep_failures"] == "true"
         keep_non_ended = flask.request.form["keep_non_ended"] == "true"
         self._logger.info(
             f"Clearing queue (keep_failures={keep_failures}, keep_non_ended={keep_non_ended})"
         )
-        changed = []
-        while i < len(self.q):
-            v = self.q[i]
+        # Filter a single snapshot and write it back once, rather than
+        # reloading and saving the queue for every removed item
+        kept = []
+        for v in self.q:
             self._logger.info(f"{v.name} -- end_ts {v.end_ts} result {v.result}")
             if v.end_ts is None and keep_non_ended:
-                i = i + 1
+                kept.append(v)
             elif v.result == "failure" and keep_failures:
-                i = i + 1
-            else:
-                del self.q[i]
-                changed.append(i)
+                kept.append(v)
+        self.q.assign(kept)
         return self.state_json()
 
     # PRIVATE API METHOD - may change without warning.
@@ -1,34 +1,84 @@
+import logging
 import time
-from enum import Enum, auto
-
-
-class Action(Enum):
-    ACTIVATE = auto()
-    DEACTIVATE = auto()
-    SUCCESS = auto()
-    FAILURE = auto()
-    SPAGHETTI = auto()
-    TICK = auto()
-
-
-class Printer(Enum):
-    IDLE = auto()
-    PAUSED = auto()
-    BUSY = auto()
+from enum import IntEnum
+
+
+# Action, Printer and State values are zero-based and contiguous; they are
+# used directly as indices into the transition table at the end of this file.
+class Action(IntEnum):
+    ACTIVATE = 0
+    DEACTIVATE = 1
+    SUCCESS = 2
+    FAILURE = 3
+    SPAGHETTI = 4
+    TICK = 5
+
+
+class Printer(IntEnum):
+    IDLE = 0
+    PAUSED = 1
+    BUSY = 2
+
+
+class State(IntEnum):
+    UNKNOWN = 0
+    INACTIVE = 1
+    START_PRINT = 2
+    PRINTING = 3
+    PAUSED = 4
+    SPAGHETTI_RECOVERY = 5
+    FAILURE = 6
+    SUCCESS = 7
+    START_SCRIPT = 8
+    RUNNING_SCRIPT = 9
+
+
+# Fixed status messages
+_S_INITIALIZING = "Initializing"
+_S_INACTIVE_IDLE = "Inactive (click Start Managing)"
+_S_INACTIVE_BUSY = "Inactive (active print continues unmanaged)"
+_S_WAITING = "Waiting for printer to be ready"
+_S_PAUSED = "Queue paused"
+_S_SPAGHETTI = "Cancelling print (spaghetti seen early in print)"
+_S_FINISHING = "Finising up"
+_S_CLEARING = "Clearing bed"
+
+
+# (upper bound in seconds, divisor, unit), checked in order
+_AGO = (
+    (60 * 60, 60, "minutes"),
+    (60 * 60 * 24, 60 * 60, "hours"),
+    (float("inf"), 60 * 60 * 24, "days"),
+)
 
 
 # Inspired by answers at
 # https://stackoverflow.com/questions/6108819/javascript-timestamp-to-relative-time
 def timeAgo(elapsed):
-    if elapsed < 60 * 60:
-        return str(round(elapsed / (60))) + " minutes"
-    elif elapsed < 60 * 60 * 24:
-        return str(round(elapsed / (60 * 60))) + " hours"
-    else:
-        return str(round(elapsed / (60 * 60 * 24))) + " days"
+    for t, d, u in _AGO:
+        if elapsed < t:
+            return f"{int(elapsed // d)} {u}"
 
 
 class ContinuousPrintDriver:
+    __slots__ = (
+        "_logger",
+        "status",
+        "q",
+        "state",
+        "retries",
+        "retry_on_pause",
+        "max_retries",
+        "retry_threshold_seconds",
+        "first_print",
+        "_runner",
+        "_intent",
+        "_update_ui",
+        "_cur_path",
+        "_cur_materials",
+        "_script",
+    )
+
     def __init__(
         self,
         queue,
@@ -37,9 +87,9 @@ class ContinuousPrintDriver:
     ):
         self._logger = logger
         self.status = None
-        self._set_status("Initializing")
+        self._set_status(_S_INITIALIZING)
         self.q = queue
-        self.state = self._state_unknown
+        self.state = State.UNKNOWN
         self.retries = 0
         self.retry_on_pause = False
         self.max_retries = 0
@@ -49,17 +99,32 @@ class ContinuousPrintDriver:
         self._intent = None  # Intended file path
         self._update_ui = False
         self._cur_path = None
-        self._cur_materials = []
+        self._cur_materials = ()
+        self._script = None  # (script_fn, next_state, status) of pending script
 
     def action(self, a: Action, p: Printer, path: str = None, materials: list = []):
-        self._logger.debug(f"{a.name}, {p.name}, path={path}, materials={materials}")
+        log = self._logger
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"{a.name}, {p.name}, path={path}, materials={materials}")
         if path is not None:
             self._cur_path = path
-        if len(materials) > 0:
-            self._cur_materials = materials
-        nxt = self.state(a, p)
+        if materials:
+            self._cur_materials = tuple(materials)
+
+        # Static transitions are a single table lookup; only states whose
+        # next state depends on runtime fields fall through to a handler.
+        state = self.state
+        t = _TRANSITIONS[(state * _NUM_ACTIONS + a) * _NUM_PRINTERS + p]
+        if t is not None:
+            nxt, fn = t
+            if fn is not None:
+                fn(self)
+        else:
+            handler = _HANDLERS[state]
+            nxt = handler(self, a, p) if handler is not None else None
+
         if nxt is not None:
-            self._logger.info(f"{self.state.__name__} -> {nxt.__name__}")
+            log.info("%s -> %s", state.name, nxt.name)
             self.state = nxt
             self._update_ui = True
 
@@ -68,101 +133,78 @@ class ContinuousPrintDriver:
             return True
         return False
 
-    def _state_unknown(self, a: Action, p: Printer):
-        if a == Action.DEACTIVATE:
-            return self._state_inactive
+    def _reset_retries(self):
+        self.retries = 0
 
     def _state_inactive(self, a: Action, p: Printer):
         self.retries = 0
-
-        if a == Action.ACTIVATE:
-            if p != Printer.IDLE:
-                return self._state_printing
-            else:
-                # TODO "clear bed on startup" setting
-                return self._state_start_print
-
         if p == Printer.IDLE:
-            self._set_status("Inactive (click Start Managing)")
+            self._set_status(_S_INACTIVE_IDLE)
         else:
-            self._set_status("Inactive (active print continues unmanaged)")
+            self._set_status(_S_INACTIVE_BUSY)
 
     def _state_start_print(self, a: Action, p: Printer):
-        if a == Action.DEACTIVATE:
-            return self._state_inactive
-
         if p != Printer.IDLE:
-            self._set_status("Waiting for printer to be ready")
+            self._set_status(_S_WAITING)
             return
 
-        # Block until we have the right materials loaded (if required)
-        item = self.q[self._next_available_idx()]
-        for i, im in enumerate(item.materials):
-            if im is None:  # No constraint
-                continue
-            cur = self._cur_materials[i] if i < len(self._cur_materials) else None
-            if im != cur:
-                self._set_status(
-                    f"Waiting for spool {im} in tool {i} (currently: {cur})"
-                )
-                return
-
         # The next print may not be the *immediately* next print
         # e.g. if we skip over a print or start mid-print
         idx = self._next_available_idx()
-        if idx is not None:
-            p = self.q[idx]
-            p.start_ts = int(time.time())
-            p.end_ts = None
-            p.retries = self.retries
-            self.q[idx] = p
-            self._intent = self._runner.start_print(p)
-            return self._state_printing
-        else:
-            return self._state_inactive
+        if idx is None:
+            return State.INACTIVE
+        item = self.q[idx]
+
+        # Block until we have the right materials loaded (if required).
+        # An exact match of the loaded materials is the common case, so
+        # only walk tools individually when it fails.
+        required = tuple(item.materials)
+        if required and required != self._cur_materials[: len(required)]:
+            for i, im in enumerate(required):
+                if im is None:  # No constraint
+                    continue
+                cur = self._cur_materials[i] if i < len(self._cur_materials) else None
+                if im != cur:
+                    self._set_status(
+                        f"Waiting for spool {im} in tool {i} (currently: {cur})"
+                    )
+                    return
+
+        item.start_ts = int(time.time())
+        item.end_ts = None
+        item.retries = self.retries
+        self.q[idx] = item
+        self._intent = self._runner.start_print(item)
+        return State.PRINTING
 
     def _elapsed(self):
         return time.time() - self.q[self._cur_idx()].start_ts
 
-    def _state_printing(self, a: Action, p: Printer, elapsed=None):
-        if a == Action.DEACTIVATE:
-            return self._state_inactive
-        elif a == Action.FAILURE:
-            return self._state_failure
-        elif a == Action.SPAGHETTI:
+    def _state_printing(self, a: Action, p: Printer):
+        if a == Action.SPAGHETTI:
             elapsed = self._elapsed()
             if self.retry_on_pause and elapsed < self.retry_threshold_seconds:
-                return self._state_spaghetti_recovery
+                return State.SPAGHETTI_RECOVERY
             else:
                 self._set_status(
                     f"Print paused {timeAgo(elapsed)} into print (over auto-restart threshold of {timeAgo(self.retry_threshold_seconds)}); awaiting user input"
                 )
-                return self._state_paused
-        elif a == Action.SUCCESS:
-            return self._state_success
+                return State.PAUSED
 
-        if p == Printer.BUSY:
-            idx = self._cur_idx()
-            if idx is not None:
-                self._set_status(f"Printing {self.q[idx].name}")
-        elif p == Printer.PAUSED:
-            return self._state_paused
-        elif p == Printer.IDLE:  # Idle state without event; assume success
-            return self._state_success
+        idx = self._cur_idx()
+        if idx is not None:
+            self._set_status(f"Printing {self.q[idx].name}")
 
     def _state_paused(self, a: Action, p: Printer):
-        self._set_status("Queue paused")
-        if a == Action.DEACTIVATE or p == Printer.IDLE:
-            return self._state_inactive
-        elif p == Printer.BUSY:
-            return self._state_printing
+        self._set_status(_S_PAUSED)
 
     def _state_spaghetti_recovery(self, a: Action, p: Printer):
-        self._set_status("Cancelling print (spaghetti seen early in print)")
-        if p == Printer.PAUSED:
-            self._runner.cancel_print()
-            self._intent = None
-            return self._state_failure
+        self._set_status(_S_SPAGHETTI)
+
+    def _cancel_print(self):
+        self._set_status(_S_SPAGHETTI)
+        self._runner.cancel_print()
+        self._intent = None
 
     def _state_failure(self, a: Action, p: Printer):
         if p != Printer.IDLE:
@@ -170,12 +212,12 @@ class ContinuousPrintDriver:
 
         if self.retries + 1 < self.max_retries:
             self.retries += 1
-            return self._state_start_clearing
+            return self._queue_clear_bed()
         else:
             idx = self._cur_idx()
             if idx is not None:
                 self._complete_item(idx, "failure")
-            return self._state_inactive
+            return State.INACTIVE
 
     def _state_success(self, a: Action, p: Printer):
         idx = self._cur_idx()
@@ -194,48 +236,36 @@ class ContinuousPrintDriver:
         # Clear bed if we have a next queue item, otherwise run finishing script
         idx = self._next_available_idx()
         if idx is not None:
-            return self._state_start_clearing
+            return self._queue_clear_bed()
         else:
-            return self._state_start_finishing
-
-    def _state_start_clearing(self, a: Action, p: Printer):
-        if a == Action.DEACTIVATE:
-            return self._state_inactive
-        if p != Printer.IDLE:
-            self._set_status("Waiting for printer to be ready")
-            return
-
-        self._intent = self._runner.clear_bed()
-        return self._state_clearing
+            return self._queue_script(
+                self._runner.run_finish_script, State.INACTIVE, _S_FINISHING
+            )
 
-    def _state_clearing(self, a: Action, p: Printer):
-        if a == Action.DEACTIVATE:
-            return self._state_inactive
-        if p != Printer.IDLE:
-            return
+    def _queue_script(self, script_fn, nxt, status):
+        self._script = (script_fn, nxt, status)
+        return State.START_SCRIPT
 
-        self._set_status("Clearing bed")
-        return self._state_start_print
+    def _queue_clear_bed(self):
+        return self._queue_script(
+            self._runner.clear_bed, State.START_PRINT, _S_CLEARING
+        )
 
-    def _state_start_finishing(self, a: Action, p: Printer):
-        if a == Action.DEACTIVATE:
-            return self._state_inactive
+    def _state_start_script(self, a: Action, p: Printer):
         if p != Printer.IDLE:
-            self._set_status("Waiting for printer to be ready")
+            self._set_status(_S_WAITING)
             return
 
-        self._intent = self._runner.run_finish_script()
-        return self._state_finishing
+        self._intent = self._script[0]()
+        return State.RUNNING_SCRIPT
 
-    def _state_finishing(self, a: Action, p: Printer):
-        if a == Action.DEACTIVATE:
-            return self._state_inactive
+    def _state_running_script(self, a: Action, p: Printer):
         if p != Printer.IDLE:
             return
 
-        self._set_status("Finising up")
-
-        return self._state_inactive
+        _, nxt, status = self._script
+        self._set_status(status)
+        return nxt
 
     def _set_status(self, status):
         if status != self.status:
@@ -254,24 +284,103 @@ class ContinuousPrintDriver:
         )
 
     def _cur_idx(self):
-        for (i, item) in enumerate(self.q):
-            if item.start_ts is not None and item.end_ts is None:
-                return i
-        return None
+        return self.q.current_idx()
 
     def current_path(self):
         idx = self._cur_idx()
         return None if idx is None else self.q[idx].name
 
     def _next_available_idx(self):
-        for (i, item) in enumerate(self.q):
-            if item.end_ts is None:
-                return i
-        return None
+        return self.q.next_available_idx()
 
     def _complete_item(self, idx, result):
-        self._logger.debug(f"Completing q[{idx}] - {result}")
+        self._logger.debug("Completing q[%d] - %s", idx, result)
         item = self.q[idx]
         item.end_ts = int(time.time())
         item.result = result
         self.q[idx] = item  # TODO necessary?
+
+
+# Transitions that depend only on (state, action, printer) are resolved with a
+# single list index in action(). Each entry is None or (next_state, side_effect),
+# where side_effect is called with the driver before transitioning.
+_NUM_ACTIONS = len(Action)
+_NUM_PRINTERS = len(Printer)
+
+
+def _build_tables():
+    transitions = [None] * (len(State) * _NUM_ACTIONS * _NUM_PRINTERS)
+
+    def on(state, actions, printers, nxt, fn=None):
+        # Earlier rules take precedence, mirroring if/elif ordering
+        for a in actions:
+            for p in printers:
+                i = (state * _NUM_ACTIONS + a) * _NUM_PRINTERS + p
+                if transitions[i] is None:
+                    transitions[i] = (nxt, fn)
+
+    D = ContinuousPrintDriver
+    any_action = list(Action)
+    any_printer = list(Printer)
+
+    for s in (
+        State.UNKNOWN,
+        State.START_PRINT,
+        State.PRINTING,
+        State.START_SCRIPT,
+        State.RUNNING_SCRIPT,
+    ):
+        on(s, [Action.DEACTIVATE], any_printer, State.INACTIVE)
+
+    on(
+        State.INACTIVE,
+        [Action.ACTIVATE],
+        [Printer.BUSY, Printer.PAUSED],
+        State.PRINTING,
+        D._reset_retries,
+    )
+    on(
+        State.INACTIVE,
+        [Action.ACTIVATE],
+        [Printer.IDLE],
+        State.START_PRINT,
+        D._reset_retries,
+    )
+
+    on(State.PRINTING, [Action.FAILURE], any_printer, State.FAILURE)
+    on(State.PRINTING, [Action.SUCCESS], any_printer, State.SUCCESS)
+    passive = [a for a in Action if a != Action.SPAGHETTI]
+    on(State.PRINTING, passive, [Printer.PAUSED], State.PAUSED)
+    # Idle state without event; assume success
+    on(State.PRINTING, passive, [Printer.IDLE], State.SUCCESS)
+
+    status_paused = lambda d: d._set_status(_S_PAUSED)
+    on(State.PAUSED, [Action.DEACTIVATE], any_printer, State.INACTIVE, status_paused)
+    on(State.PAUSED, any_action, [Printer.IDLE], State.INACTIVE, status_paused)
+    on(State.PAUSED, any_action, [Printer.BUSY], State.PRINTING, status_paused)
+
+    on(
+        State.SPAGHETTI_RECOVERY,
+        any_action,
+        [Printer.PAUSED],
+        State.FAILURE,
+        D._cancel_print,
+    )
+
+    # Fallback handlers for states whose transitions inspect runtime fields
+    # (queue contents, elapsed time, retries). States with no handler stay put.
+    handlers = {
+        State.INACTIVE: D._state_inactive,
+        State.START_PRINT: D._state_start_print,
+        State.PRINTING: D._state_printing,
+        State.PAUSED: D._state_paused,
+        State.SPAGHETTI_RECOVERY: D._state_spaghetti_recovery,
+        State.FAILURE: D._state_failure,
+        State.SUCCESS: D._state_success,
+        State.START_SCRIPT: D._state_start_script,
+        State.RUNNING_SCRIPT: D._state_running_script,
+    }
+    return transitions, [handlers.get(s) for s in State]
+
+
+_TRANSITIONS, _HANDLERS = _build_tables()
@@ -1,7 +1,13 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from print_queue import PrintQueue, QueueItem
-from driver import ContinuousPrintDriver, Action as DA, Printer as DP
+from driver import (
+    ContinuousPrintDriver,
+    Action as DA,
+    Printer as DP,
+    State as DS,
+    timeAgo,
+)
 from mock_settings import MockSettings
 import logging
 
@@ -49,13 +55,13 @@ class TestFromInitialState(unittest.TestCase):
         self.d.action(DA.TICK, DP.IDLE)
         self.d._runner.start_print.assert_called_once()
         self.assertEqual(self.d._runner.start_print.call_args[0][0], self.q[0])
-        self.assertEqual(self.d.state, self.d._state_printing)
+        self.assertEqual(self.d.state, DS.PRINTING)
 
     def test_activate_already_printing(self):
         self.d.action(DA.ACTIVATE, DP.BUSY)
         self.d.action(DA.TICK, DP.BUSY)
         self.d._runner.start_print.assert_not_called()
-        self.assertEqual(self.d.state, self.d._state_printing)
+        self.assertEqual(self.d.state, DS.PRINTING)
 
     def test_events_cause_no_action_when_inactive(self):
         def assert_nocalls():
@@ -66,7 +72,7 @@ class TestFromInitialState(unittest.TestCase):
             for a in [DA.SUCCESS, DA.FAILURE, DA.TICK, DA.DEACTIVATE, DA.SPAGHETTI]:
                 self.d.action(a, p)
                 assert_nocalls()
-                self.assertEqual(self.d.state, self.d._state_inactive)
+                self.assertEqual(self.d.state, DS.INACTIVE)
 
     def test_completed_print_not_in_queue(self):
         self.d.action(DA.ACTIVATE, DP.BUSY)
@@ -106,12 +112,12 @@ class TestFromInitialState(unittest.TestCase):
         self.assertEqual(self.d._runner.start_print.call_args[0][0], self.q[1])
 
     def test_start_clearing_waits_for_idle(self):
-        self.d.state = self.d._state_start_clearing
+        self.d.state = self.d._queue_clear_bed()
         self.d.action(DA.TICK, DP.BUSY)
-        self.assertEqual(self.d.state, self.d._state_start_clearing)
+        self.assertEqual(self.d.state, DS.START_SCRIPT)
         self.d._runner.clear_bed.assert_not_called()
         self.d.action(DA.TICK, DP.PAUSED)
-        self.assertEqual(self.d.state, self.d._state_start_clearing)
+        self.assertEqual(self.d.state, DS.START_SCRIPT)
         self.d._runner.clear_bed.assert_not_called()
 
 
@@ -119,6 +125,11 @@ class TestPartiallyComplete(unittest.TestCase):
     def setUp(self):
         setupTestQueueAndDriver(self, 1)
 
+    def _set_elapsed(self, elapsed):
+        patcher = patch.object(ContinuousPrintDriver, "_elapsed", return_value=elapsed)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_success(self):
         self.d.action(DA.ACTIVATE, DP.IDLE)  # -> start_print
         self.d.action(DA.TICK, DP.IDLE)  # -> printing
@@ -157,52 +168,47 @@ class TestPartiallyComplete(unittest.TestCase):
         self.d.action(DA.ACTIVATE, DP.IDLE)  # -> start_print
         self.d.action(DA.TICK, DP.IDLE)  # -> printing
 
-        self.d._elapsed = lambda: 10
+        self._set_elapsed(10)
         self.d.action(DA.SPAGHETTI, DP.BUSY)  # -> spaghetti_recovery
         self.d.action(DA.TICK, DP.PAUSED)  # -> cancel + failure
         self.d._runner.cancel_print.assert_called()
-        self.assertEqual(self.d.state, self.d._state_failure)
+        self.assertEqual(self.d.state, DS.FAILURE)
 
     def test_paused_with_spaghetti_late_waits_for_user(self):
         self.d.action(DA.ACTIVATE, DP.IDLE)  # -> start_print
         self.d.action(DA.TICK, DP.IDLE)  # -> printing
 
-        self.d._elapsed = lambda: self.d.retry_threshold_seconds + 1
+        self._set_elapsed(self.d.retry_threshold_seconds + 1)
         self.d.action(DA.SPAGHETTI, DP.BUSY)  # -> printing (ignore spaghetti)
         self.d.action(DA.TICK, DP.PAUSED)  # -> paused
         self.d._runner.cancel_print.assert_not_called()
-        self.assertEqual(self.d.state, self.d._state_paused)
+        self.assertEqual(self.d.state, DS.PAUSED)
 
     def test_paused_manually_early_waits_for_user(self):
         self.d.action(DA.ACTIVATE, DP.IDLE)  # -> start_print
         self.d.action(DA.TICK, DP.IDLE)  # -> printing
 
-        self.d._elapsed = lambda: 10
+        self._set_elapsed(10)
         self.d.action(DA.TICK, DP.PAUSED)  # -> paused
         self.d.action(DA.TICK, DP.PAUSED)  # stay in paused state
         self.d._runner.cancel_print.assert_not_called()
-        self.assertEqual(self.d.state, self.d._state_paused)
+        self.assertEqual(self.d.state, DS.PAUSED)
 
     def test_paused_manually_late_waits_for_user(self):
         self.d.action(DA.ACTIVATE, DP.IDLE)  # -> start_print
         self.d.action(DA.TICK, DP.IDLE)  # -> printing
 
-        self.d._elapsed = lambda: 1000
+        self._set_elapsed(1000)
         self.d.action(DA.TICK, DP.PAUSED)  # -> paused
         self.d.action(DA.TICK, DP.PAUSED)  # stay in paused state
         self.d._runner.cancel_print.assert_not_called()
-        self.assertEqual(self.d.state, self.d._state_paused)
+        self.assertEqual(self.d.state, DS.PAUSED)
 
     def test_paused_on_temp_file_falls_through(self):
-        self.d.state = self.d._state_clearing  # -> clearing
+        self.d.state = DS.RUNNING_SCRIPT  # -> clearing / finishing
         self.d.action(DA.TICK, DP.PAUSED)
         self.d._runner.cancel_print.assert_not_called()
-        self.assertEqual(self.d.state, self.d._state_clearing)
-
-        self.d.state = self.d._state_finishing  # -> finishing
-        self.d.action(DA.TICK, DP.PAUSED)
-        self.d._runner.cancel_print.assert_not_called()
-        self.assertEqual(self.d.state, self.d._state_finishing)
+        self.assertEqual(self.d.state, DS.RUNNING_SCRIPT)
 
     def test_user_deactivate_sets_inactive(self):
         self.d.action(DA.ACTIVATE, DP.IDLE)  # -> start_print
@@ -210,16 +216,17 @@ class TestPartiallyComplete(unittest.TestCase):
         self.d._runner.start_print.reset_mock()
 
         self.d.action(DA.DEACTIVATE, DP.IDLE)  # -> inactive
-        self.assertEqual(self.d.state, self.d._state_inactive)
+        self.assertEqual(self.d.state, DS.INACTIVE)
         self.d._runner.start_print.assert_not_called()
         self.assertEqual(self.q[1].result, None)
 
     def test_retry_after_failure(self):
-        self.d.state = self.d._state_failure
+        self.d.state = DS.FAILURE
         self.d.retries = self.d.max_retries - 2
         self.d.action(DA.TICK, DP.IDLE)  # Start clearing
         self.assertEqual(self.d.retries, self.d.max_retries - 1)
-        self.assertEqual(self.d.state, self.d._state_start_clearing)
+        self.assertEqual(self.d.state, DS.START_SCRIPT)
+        self.assertEqual(self.d._script[0], self.d._runner.clear_bed)
 
     def test_activate_clears_retries(self):
         self.d.retries = self.d.max_retries - 1
@@ -227,15 +234,20 @@ class TestPartiallyComplete(unittest.TestCase):
         self.assertEqual(self.d.retries, 0)
 
     def test_failure_with_max_retries_sets_inactive(self):
-        self.d.state = self.d._state_failure
+        self.d.state = DS.FAILURE
         self.d.retries = self.d.max_retries - 1
         self.d.action(DA.TICK, DP.IDLE)  # -> inactive
-        self.assertEqual(self.d.state, self.d._state_inactive)
+        self.assertEqual(self.d.state, DS.INACTIVE)
 
     def test_resume_from_pause(self):
-        self.d.state = self.d._state_paused
+        self.d.state = DS.PAUSED
         self.d.action(DA.TICK, DP.BUSY)
-        self.assertEqual(self.d.state, self.d._state_printing)
+        self.assertEqual(self.d.state, DS.PRINTING)
+
+    def test_deactivate_from_pause(self):
+        self.d.state = DS.PAUSED
+        self.d.action(DA.DEACTIVATE, DP.PAUSED)
+        self.assertEqual(self.d.state, DS.INACTIVE)
 
 
 class TestOnLastPrint(unittest.TestCase):
@@ -254,10 +266,10 @@ class TestOnLastPrint(unittest.TestCase):
         self.d.action(DA.TICK, DP.IDLE)  # -> start_finishing
         self.d.action(DA.TICK, DP.IDLE)  # -> finishing
         self.d._runner.run_finish_script.assert_called()
-        self.assertEqual(self.d.state, self.d._state_finishing)
+        self.assertEqual(self.d.state, DS.RUNNING_SCRIPT)
 
         self.d.action(DA.TICK, DP.IDLE)  # -> inactive
-        self.assertEqual(self.d.state, self.d._state_inactive)
+        self.assertEqual(self.d.state, DS.INACTIVE)
 
 
 class TestMaterialConstraints(unittest.TestCase):
@@ -272,56 +284,79 @@ class TestMaterialConstraints(unittest.TestCase):
         self.d.action(DA.ACTIVATE, DP.IDLE)
         self.d.action(DA.TICK, DP.IDLE)
         self.d._runner.start_print.assert_called()
-        self.assertEqual(self.d.state, self.d._state_printing)
+        self.assertEqual(self.d.state, DS.PRINTING)
 
     def test_none(self):
         self._setItemMaterials([None])
         self.d.action(DA.ACTIVATE, DP.IDLE)
         self.d.action(DA.TICK, DP.IDLE)
         self.d._runner.start_print.assert_called()
-        self.assertEqual(self.d.state, self.d._state_printing)
+        self.assertEqual(self.d.state, DS.PRINTING)
 
     def test_tool1mat_none(self):
         self._setItemMaterials(["tool1mat"])
         self.d.action(DA.ACTIVATE, DP.IDLE)
         self.d.action(DA.TICK, DP.IDLE)
         self.d._runner.start_print.assert_not_called()
-        self.assertEqual(self.d.state, self.d._state_start_print)
+        self.assertEqual(self.d.state, DS.START_PRINT)
 
     def test_tool1mat_wrong(self):
         self._setItemMaterials(["tool1mat"])
         self.d.action(DA.ACTIVATE, DP.IDLE)
         self.d.action(DA.TICK, DP.IDLE, materials=["tool0bad"])
         self.d._runner.start_print.assert_not_called()
-        self.assertEqual(self.d.state, self.d._state_start_print)
+        self.assertEqual(self.d.state, DS.START_PRINT)
 
     def test_tool1mat_ok(self):
         self._setItemMaterials(["tool1mat"])
         self.d.action(DA.ACTIVATE, DP.IDLE)
         self.d.action(DA.TICK, DP.IDLE, materials=["tool1mat"])
         self.d._runner.start_print.assert_called()
-        self.assertEqual(self.d.state, self.d._state_printing)
+        self.assertEqual(self.d.state, DS.PRINTING)
 
     def test_tool2mat_ok(self):
         self._setItemMaterials([None, "tool2mat"])
         self.d.action(DA.ACTIVATE, DP.IDLE)
         self.d.action(DA.TICK, DP.IDLE, materials=[None, "tool2mat"])
         self.d._runner.start_print.assert_called()
-        self.assertEqual(self.d.state, self.d._state_printing)
+        self.assertEqual(self.d.state, DS.PRINTING)
 
     def test_tool1mat_tool2mat_ok(self):
         self._setItemMaterials(["tool1mat", "tool2mat"])
         self.d.action(DA.ACTIVATE, DP.IDLE)
         self.d.action(DA.TICK, DP.IDLE, materials=["tool1mat", "tool2mat"])
         self.d._runner.start_print.assert_called()
-        self.assertEqual(self.d.state, self.d._state_printing)
+        self.assertEqual(self.d.state, DS.PRINTING)
+
+    def test_tool1mat_extra_loaded_ok(self):
+        self._setItemMaterials(["tool1mat"])
+        self.d.action(DA.ACTIVATE, DP.IDLE)
+        self.d.action(DA.TICK, DP.IDLE, materials=["tool1mat", "tool2mat"])
+        self.d._runner.start_print.assert_called()
+        self.assertEqual(self.d.state, DS.PRINTING)
 
     def test_tool1mat_tool2mat_reversed(self):
         self._setItemMaterials(["tool1mat", "tool2mat"])
         self.d.action(DA.ACTIVATE, DP.IDLE)
         self.d.action(DA.TICK, DP.IDLE, materials=["tool2mat", "tool1mat"])
         self.d._runner.start_print.assert_not_called()
-        self.assertEqual(self.d.state, self.d._state_start_print)
+        self.assertEqual(self.d.state, DS.START_PRINT)
+
+
+class TestTimeAgo(unittest.TestCase):
+    def test_units(self):
+        self.assertEqual(timeAgo(10 * 60), "10 minutes")
+        self.assertEqual(timeAgo(3 * 60 * 60 + 1.5), "3 hours")
+        self.assertEqual(timeAgo(2 * 60 * 60 * 24), "2 days")
+
+    def test_boundaries_floor(self):
+        self.assertEqual(timeAgo(59), "0 minutes")
+        self.assertEqual(timeAgo(60), "1 minutes")
+        self.assertEqual(timeAgo(90), "1 minutes")
+        self.assertEqual(timeAgo(60 * 60 - 1), "59 minutes")
+        self.assertEqual(timeAgo(60 * 60), "1 hours")
+        self.assertEqual(timeAgo(60 * 60 * 24 - 1), "23 hours")
+        self.assertEqual(timeAgo(60 * 60 * 24), "1 days")
 
 
 if __name__ == "__main__":
@@ -50,36 +50,49 @@ class PrintQueue:
         self._logger = logger
         self._settings = settings
         self.q = []
+        self._loaded = None  # Serialized queue that self._parsed came from
+        self._parsed = []  # Valid item dicts parsed from self._loaded
         self._load()
 
     def _save(self):
         self._settings.set([self.key], json.dumps([i.__dict__ for i in self.q]))
         self._settings.save()
+        self._loaded = None
 
     def _load(self):
-        items = []
-        for v in json.loads(self._settings.get([self.key])):
-            if v.get("path") is None:
-                if self._logger is not None:
-                    self._logger.error(f"Invalid queue item {str(v)}, ignoring")
-                continue
-            items.append(
-                QueueItem(
-                    name=v.get(
-                        "name", v["path"]
-                    ),  # Use path if name not given (old plugin version data may do this)
-                    path=v["path"],
-                    sd=v.get("sd", False),
-                    start_ts=v.get("start_ts"),
-                    end_ts=v.get("end_ts"),
-                    result=v.get("result"),
-                    job=v.get("job"),
-                    materials=v.get("materials", []),
-                    run=v.get("run"),
-                    retries=v.get("retries", 0),
-                )
+        # Only the JSON parse is memoized. Items are rebuilt on every load so
+        # that unsaved changes to returned items never leak into the queue.
+        data = self._settings.get([self.key])
+        if data != self._loaded:
+            parsed = []
+            for v in json.loads(data):
+                if v.get("path") is None:
+                    if self._logger is not None:
+                        self._logger.error(f"Invalid queue item {str(v)}, ignoring")
+                    continue
+                parsed.append(v)
+            self._parsed = parsed
+            self._loaded = data
+
+        # Items are only written back on mutation; reloading must not
+        # re-serialize and save the queue on every read.
+        self.q = [
+            QueueItem(
+                name=v.get(
+                    "name", v["path"]
+                ),  # Use path if name not given (old plugin version data may do this)
+                path=v["path"],
+                sd=v.get("sd", False),
+                start_ts=v.get("start_ts"),
+                end_ts=v.get("end_ts"),
+                result=v.get("result"),
+                job=v.get("job"),
+                materials=list(v.get("materials", [])),
+                run=v.get("run"),
+                retries=v.get("retries", 0),
             )
-        self.assign(items)
+            for v in self._parsed
+        ]
 
     def _validate(self, item):
         if not isinstance(item, QueueItem):
@@ -104,6 +117,13 @@ class PrintQueue:
         self._load()
         return self.q[i]
 
+    def __iter__(self):
+        # _load() replaces self.q with freshly built items, so it is already a
+        # snapshot; without this, iteration falls back to __getitem__ and
+        # reloads the whole queue for every index.
+        self._load()
+        return iter(self.q)
+
     def __setitem__(self, i, v):
         self._validate(v)
         self._load()
@@ -144,6 +164,19 @@ class PrintQueue:
         self._load()
         return self.q[0] if len(self.q) > 0 else None
 
+    def current_idx(self):
+        return next(
+            (
+                i
+                for i, item in enumerate(self)
+                if item.start_ts is not None and item.end_ts is None
+            ),
+            None,
+        )
+
+    def next_available_idx(self):
+        return next((i for i, item in enumerate(self) if item.end_ts is None), None)
+
     def available(self):
         self._load()
         return list(filter(lambda i: i.end_ts is None, self.q))
@@ -1,5 +1,7 @@
 import unittest
+import copy
 import json
+from unittest.mock import MagicMock, patch
 from print_queue import PrintQueue, QueueItem
 from mock_settings import MockSettings
 
@@ -94,6 +96,64 @@ class TestPrintQueue(unittest.TestCase):
                 % (i, [v.name for v in expected], [v.name for v in self.q]),
             )
 
+    def test_iter_loads_once(self):
+        self.q.add(test_items)
+        self.q._load = MagicMock(wraps=self.q._load)
+        self.assertEqual([i for i in self.q], test_items)
+        self.q._load.assert_called_once()
+
+    def test_read_does_not_save(self):
+        self.q.add(test_items)
+        self.s.save = MagicMock()
+        self.q[0]
+        len(self.q)
+        self.q.available()
+        self.s.save.assert_not_called()
+
+    def test_unchanged_queue_not_reparsed(self):
+        self.q.add(test_items)
+        self.q[0]
+        with patch.object(json, "loads", wraps=json.loads) as loads:
+            self.q[0]
+            len(self.q)
+            self.q.available()
+            loads.assert_not_called()
+
+    def test_unsaved_item_changes_not_kept(self):
+        self.q.add(test_items)
+        self.q[2].end_ts = 789
+        self.q[2].materials.append("tool1mat")
+        self.assertEqual(self.q[2].end_ts, None)
+        self.assertEqual(self.q[2].materials, [])
+        self.assertEqual(self.q.next_available_idx(), 2)
+
+    def test_complete_does_not_change_added_items(self):
+        self.q.add(test_items)
+        self.q.complete("/baz.gco", "done")
+        self.assertEqual(test_items[2].end_ts, None)
+
+    def test_external_change_reloads(self):
+        self.q.add(test_items)
+        self.s.set(["q"], json.dumps([test_items[2].__dict__]))
+        self.assertEqual(len(self.q), 1)
+        self.assertEqual(self.q[0], test_items[2])
+
+    def test_current_and_next_available_idx(self):
+        self.assertEqual(self.q.current_idx(), None)
+        self.assertEqual(self.q.next_available_idx(), None)
+        self.q.add(copy.deepcopy(test_items))
+        self.assertEqual(self.q.current_idx(), None)
+        self.assertEqual(self.q.next_available_idx(), 2)
+
+        item = self.q[2]
+        item.start_ts = 789
+        self.q[2] = item
+        self.assertEqual(self.q.current_idx(), 2)
+
+        self.q.complete("/baz.gco", "done")
+        self.assertEqual(self.q.current_idx(), None)
+        self.assertEqual(self.q.next_available_idx(), 3)
+
     def test_available(self):
         self.q.add(test_items)
         self.assertEqual(len(self.q.available()), len(test_items) - 2)